@@ -1,6 +1,7 @@
 
 import subprocess
 import base64
+import os
 
 # Path to the Conda environment
 conda_env_path = "/opt/homebrew/Caskroom/miniconda/base/envs/friday2-embedded"
@@ -15,38 +16,35 @@ num_threads = 10
 compression_level = 9
 
 def get_excluded_files(env_path):
-    """Finds all problematic files (hard links, symlinks, empty files)"""
+    """Finds all problematic files (hard links, symlinks, empty files) in a single traversal"""
     exclude_files = []
 
-    # Find hard-linked files
-    hardlinked_result = subprocess.run(
-        ["find", env_path, "-type", "f", "-links", "+1"],
-        capture_output=True, text=True
-    )
-    hardlinked_files = hardlinked_result.stdout.strip().split("\n") if hardlinked_result.stdout else []
-
-    # Find symbolic links
-    symlink_result = subprocess.run(
-        ["find", env_path, "-type", "l"],
-        capture_output=True, text=True
-    )
-    symlink_files = symlink_result.stdout.strip().split("\n") if symlink_result.stdout else []
-
-    # Find empty files (zero-byte)
-    empty_result = subprocess.run(
-        ["find", env_path, "-type", "f", "-empty"],
-        capture_output=True, text=True
-    )
-    empty_files = empty_result.stdout.strip().split("\n") if empty_result.stdout else []
+    hardlinked_files = []
+    symlink_files = []
+    empty_files = []
+
+    # Walk the tree once, one lstat per regular file classifies it
+    # (find is not used, BSD find on macOS has no -printf to tag the results)
+    directories = [env_path]
+    while directories:
+        with os.scandir(directories.pop()) as entries:
+            for entry in entries:
+                if entry.is_symlink():
+                    symlink_files.append(entry.path)
+                elif entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    if stat.st_nlink > 1:
+                        hardlinked_files.append(entry.path)
+                    elif stat.st_size == 0:
+                        empty_files.append(entry.path)
 
     # Collect all files to exclude
     exclude_files.extend(hardlinked_files)
     exclude_files.extend(symlink_files)
     exclude_files.extend(empty_files)
 
-    # Filter out empty strings (caused by empty outputs)
-    exclude_files = [file for file in exclude_files if file.strip()]
-
     return exclude_files
 
 def pack_conda_env(env_path, output_tar, exclude_files, num_threads, compression_level):
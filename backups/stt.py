@@ -2,169 +2,284 @@
 # @this module uses a custom model to recognize speech
 # - particularly my voice and commands
 
-from friday2 import MODEL_PATH, MODEL_BASENAME, CONFIGURATION
-from transformers import WhisperProcessor, WhisperForConditionalGeneration
-from pydub import silence, AudioSegment
+from friday2 import MODEL_PATH, MODEL_CT2_PATH, MODEL_BASENAME, convert_ct2_model
 
+import sounddevice
 import colorama
-import pyaudio
+import threading
+import asyncio
 import numpy
-import torch
-import wave
-import os
 
 
-FORMAT = pyaudio.paInt16
+# @torch is imported by STTEngine, so importing this module stays cheap
+# - (the wakeword loop runs without whisper or torch loaded)
+torch = None
+
+
 CHANNELS = 1
 RATE = 16000
-CHUNK = 1024
-SILENCE_THRESHOLD = 1000
-SILENCE_DURATION = 3
+CHUNK = 512 # silero vad works on 512 sample windows at 16kHz
+SPEECH_THRESHOLD = 0.5
+SILENCE_THRESHOLD = 300 # mean absolute amplitude over a trim window
+SILENCE_WINDOW = RATE // 20 # 50 ms
+SILENCE_DURATION = 0.5
+MAX_NEW_TOKENS = 96
+
 
 class STTEngine:
     
     def __init__(self, debug: bool = True) -> None:
 
-        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        global torch
+        import torch
+
+        # @apple silicon gpu, then cuda, then cpu
+        if torch.backends.mps.is_available():
+            self.device = 'mps'
+        elif torch.cuda.is_available():
+            self.device = 'cuda'
+        else:
+            self.device = 'cpu'
         
         if debug is True:
             print(colorama.Fore.RED + '@using' + colorama.Fore.RESET, self.device)
             print(colorama.Fore.MAGENTA + '@loading' + colorama.Fore.RESET, MODEL_BASENAME, 'model...')
         
-        self.processor = WhisperProcessor.from_pretrained(MODEL_PATH)
-        self.model = WhisperForConditionalGeneration.from_pretrained(MODEL_PATH).to(self.device)
+        self.backend = 'ct2'
+
+        # @transformers in float16 on the apple silicon gpu (ctranslate2 has no mps support)
+        if self.device == 'mps':
+            from transformers import WhisperProcessor, WhisperForConditionalGeneration
+
+            self.processor = WhisperProcessor.from_pretrained(MODEL_PATH)
+            self.model = WhisperForConditionalGeneration.from_pretrained(
+                MODEL_PATH,
+                torch_dtype=torch.float16
+            ).to(self.device)
+            self.backend = 'hf'
+
+        # @ctranslate2 int8 kernels on cpu, int8 weights with float16 activations on cuda
+        if self.backend == 'ct2':
+            from faster_whisper import WhisperModel
+
+            convert_ct2_model()
+
+            self.model = WhisperModel(
+                str(MODEL_CT2_PATH),
+                device=self.device,
+                compute_type='int8' if self.device == 'cpu' else 'int8_float16'
+            )
+
+        if debug is True:
+            print(colorama.Fore.RED + '@backend' + colorama.Fore.RESET, self.backend)
+
+        # @silero vad for speech/silence gating
+        self.vad, _ = torch.hub.load('snakers4/silero-vad', 'silero_vad')
+
         self.debug = debug
 
-    # @method to check if currently silent
-    def _is_silent(self, audio_data, threshold: int = SILENCE_THRESHOLD) -> bool:
-        return numpy.max(numpy.abs(audio_data)) < threshold
+        # @pay the first-call tax (allocations, kernel selection)
+        # - in the background while friday is still talking
+        self._warmup_thread = threading.Thread(target=self._warmup, daemon=True)
+        self._warmup_thread.start()
 
+    # @method to run one silent transcription through the model
+    # - capped at one new token: the encoder and one decoder step run, nothing more
+    def _warmup(self) -> None:
 
-    # @method to record audio with auto stopping at silence
-    def _record(self):
+        self._transcribe(numpy.zeros(RATE, dtype=numpy.int16), max_new_tokens=1)
 
-        p = pyaudio.PyAudio()
-        stream = p.open(format=FORMAT, channels=CHANNELS, rate=RATE, input=True, frames_per_buffer=CHUNK)
+        if self.device == 'cuda':
+            torch.cuda.synchronize()
+        elif self.device == 'mps':
+            torch.mps.synchronize()
 
-        frames = []
+    # @method to check if a chunk contains speech
+    def _is_speech(self, audio_data) -> bool:
+        # @one fused int16 -> scaled float32 pass, no intermediate array per chunk
+        audio_data = torch.from_numpy(numpy.multiply(audio_data, 1 / 32768.0, dtype=numpy.float32))
+        return self.vad(audio_data, RATE).item() >= SPEECH_THRESHOLD
+
+
+    # @capture stage: forwards the portaudio chunks into the event loop
+    async def _capture(self, chunks: asyncio.Queue, stop: asyncio.Event) -> None:
+
+        loop = asyncio.get_running_loop()
+
+        # @runs on the portaudio thread, only hands the chunk over
+        def callback(indata, frames, time, status):
+            loop.call_soon_threadsafe(chunks.put_nowait, indata[:, 0].copy())
+
+        with sounddevice.InputStream(samplerate=RATE, channels=CHANNELS, dtype='int16', blocksize=CHUNK, callback=callback):
+            await stop.wait()
+
+
+    # @vad stage: labels the chunks once speech starts, ends the capture at silence
+    async def _gate(self, chunks: asyncio.Queue, speech: asyncio.Queue, stop: asyncio.Event) -> None:
+
+        recording = False
         silent_chunks = 0
         max_silent_chunks = int(SILENCE_DURATION * RATE / CHUNK)
 
-        # @waiting for speech at this time,
-        if self.debug:
-            print("Friday is listening.")
-
         while True:
-            data = stream.read(CHUNK)
-            audio_data = numpy.frombuffer(data, dtype=numpy.int16)
-            if not self._is_silent(audio_data):
-                frames.append(data)
+            audio_data = await chunks.get()
+            is_speech = self._is_speech(audio_data)
+
+            # @waiting for speech at this time,
+            if not recording:
+                if not is_speech:
+                    continue
+                recording = True
                 # @speech is detected here
                 if self.debug:
                     print(colorama.Fore.BLUE + "@speech-detected" + colorama.Fore.RESET, colorama.Fore.RED + '@recording' + colorama.Fore.RESET, end='\r')
-                break
-        
-        # @record until silence is detected
 
-        while True:
-            data = stream.read(CHUNK)
-            frames.append(data)
-            audio_data = numpy.frombuffer(data, dtype=numpy.int16)
+            speech.put_nowait((audio_data, is_speech))
 
-            if self._is_silent(audio_data):
-                silent_chunks += 1
-            else:
+            if is_speech:
                 silent_chunks = 0
-            
+            else:
+                silent_chunks += 1
+
             # @stop if enough silent chunks are present
             if silent_chunks >= max_silent_chunks:
                 # @recording stopped here
                 if self.debug:
                     print(colorama.Fore.BLUE + "@speech-detected" + colorama.Fore.RESET, colorama.Fore.RED + '@recording' + colorama.Fore.RESET, colorama.Fore.BLUE + '@silence-detected' + colorama.Fore.RESET)
                 break
-        
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
-
-        # @save the audio file
-        temp_file = CONFIGURATION.joinpath("tempp-friday2-stt-input.wav")
-        wf = wave.open(str(temp_file), 'wb')
-        wf.setnchannels(CHANNELS)
-        wf.setsampwidth(p.get_sample_size(FORMAT))
-        wf.setframerate(RATE)
-        wf.writeframes(b''.join(frames))
-        wf.close()
 
-        if self.debug:
-            print("Friday is processing inputs.")
+        stop.set()
+        speech.put_nowait(None)
 
-        return temp_file
+        # @the vad is stateful, start fresh for the next recording
+        self.vad.reset_states()
 
 
-    # @method to trim trailing silence
-    def _trim_silence(self, audio_file):
-        
-        audio = AudioSegment.from_wav(audio_file)
+    # @decode stage: starts transcribing at the first pause, so that the
+    # - decode overlaps the silence that confirms the end of speech
+    async def _decode(self, speech: asyncio.Queue) -> str:
 
-        non_silent = silence.detect_nonsilent(audio, min_silence_len=500, silence_thresh=40)
-        
-        if not non_silent:
-            return audio_file
-        
-        # @get start and end times
-        start_time = non_silent[0][0]
-        end_time = non_silent[-1][1]
+        loop = asyncio.get_running_loop()
 
-        # @trim the audio
-        trimmed_audio = audio[start_time:end_time]
+        frames = []
+        spoken = 0 # number of chunks up to the last speech chunk
+        speculation = None
+        speculated = 0
 
-        # @save the trimmed audio
-        trimmed_file = CONFIGURATION.joinpath('tempp-friday2-stt-input-trimmed.wav')
-        trimmed_audio.export(trimmed_file, format='wav')
+        def transcribe(frames):
+            # @the model is only used once the warmup is done
+            self._warmup_thread.join()
+            return self._transcribe(self._trim_silence(numpy.concatenate(frames)))
 
-        return trimmed_file
+        while True:
+            item = await speech.get()
+            if item is None:
+                break
 
+            audio_data, is_speech = item
+            frames.append(audio_data)
 
-    # @method to transcribe audio
-    def _transcribe(self, audio_file):
+            if is_speech:
+                spoken = len(frames)
+            elif speculated != spoken and (speculation is None or speculation.done()):
+                # @one decode at a time, the model is not shared across threads
+                speculation = loop.run_in_executor(None, transcribe, frames[:spoken])
+                speculated = spoken
+
+        if self.debug:
+            print("Friday is processing inputs.")
+            print(colorama.Fore.MAGENTA + '@transcribing' + colorama.Fore.RESET)
+
+        # @nothing but silence was added after the speculative decode, use it
+        if speculation is not None:
+            transcription = await speculation
+            if speculated == spoken:
+                return transcription
+
+        return await loop.run_in_executor(None, transcribe, frames[:spoken])
+
+
+    # @method to trim leading and trailing silence
+    def _trim_silence(self, audio_array):
 
-        audio = AudioSegment.from_wav(audio_file)
-        audio = audio.set_frame_rate(16000)
-        audio = audio.set_channels(1)
+        if len(audio_array) <= SILENCE_WINDOW:
+            return audio_array
 
-        # @convert to numpy array
-        audio_array = numpy.array(audio.get_array_of_samples()).astype(numpy.float32) / 32768.0
+        # @rolling energy over SILENCE_WINDOW samples from one running sum
+        # - (int64, a long recording overflows int32), abs casts while it
+        # - reads and the sum runs in place, so only one buffer is allocated
+        csum = numpy.abs(audio_array, dtype=numpy.int64)
+        numpy.cumsum(csum, out=csum)
+        energy = csum[SILENCE_WINDOW:] - csum[:-SILENCE_WINDOW]
+        non_silent = energy > SILENCE_THRESHOLD * SILENCE_WINDOW
 
-        # @process with whisper
-        input_features = self.processor.feature_extractor(
-            audio_array,
-            sampling_rate=16000,
-            return_tensors='pt'
-        ).input_features.to(self.device)
+        if not non_silent.any():
+            return audio_array
 
-        # @create attention mask (fixing the attention mask issue)
-        attention_mask = torch.ones_like(input_features)
+        # @first and last non silent window
+        start = numpy.argmax(non_silent)
+        end = len(non_silent) - numpy.argmax(non_silent[::-1])
 
-        # @generate tokens with forced English language (fixing auto-detection warning)
-        with torch.no_grad():
-            # @set forced_decoder_ids to ensure English transcription
-            forced_decoder_ids = self.processor.get_decoder_prompt_ids(
+        # @trim the audio (a view, no copy)
+        return audio_array[start:end + SILENCE_WINDOW]
+
+
+    # @method to transcribe audio
+    # - max_new_tokens caps the decode (None: MAX_NEW_TOKENS on hf, no cap on ctranslate2)
+    def _transcribe(self, audio_array, max_new_tokens=None):
+
+        # @int16 samples to float32 in [-1, 1]
+        audio = audio_array.astype(numpy.float32)
+        audio *= 1 / 32768.0
+
+        if self.backend == 'hf':
+            input_features = self.processor.feature_extractor(
+                audio,
+                sampling_rate=RATE,
+                return_tensors='pt'
+            ).input_features.to(self.device, dtype=torch.float16)
+
+            # @generate with forced English transcription
+            with torch.no_grad():
+                predicted_ids = self.model.generate(
+                    input_features,
+                    language='en',
+                    task='transcribe',
+                    max_new_tokens=max_new_tokens or MAX_NEW_TOKENS
+                )
+
+            transcription = self.processor.batch_decode(predicted_ids, skip_special_tokens=True)[0].strip()
+        else:
+            # @forced English, greedy decoding; feature extraction and
+            # - the decoder prompt are handled by ctranslate2 itself
+            segments, _ = self.model.transcribe(
+                audio,
                 language='en',
-                task='transcribe'
+                beam_size=1,
+                vad_filter=False,
+                max_new_tokens=max_new_tokens
             )
 
-            # @generate with attention mask and forced decoder ids
-            predicted_ids = self.model.generate(
-                input_features,
-                attention_mask=attention_mask,
-                forced_decoder_ids=forced_decoder_ids
-            )
-        
+            # @segments is a generator, decoding happens while joining
+            transcription = ''.join(segment.text for segment in segments).strip()
+
+        return transcription
+
+    # @record, gate and decode run as concurrent stages
+    async def transcribe_async(self) -> str:
+
+        chunks = asyncio.Queue()
+        speech = asyncio.Queue()
+        stop = asyncio.Event()
+
         if self.debug:
-            print(colorama.Fore.MAGENTA + '@transcribing' + colorama.Fore.RESET)
-        # @decode the tokens
-        transcription = self.processor.batch_decode(predicted_ids, skip_special_tokens=True)[0]
+            print("Friday is listening.")
+
+        _, _, transcription = await asyncio.gather(
+            self._capture(chunks, stop),
+            self._gate(chunks, speech, stop),
+            self._decode(speech)
+        )
 
         if self.debug:
             print(colorama.Fore.GREEN + '@caught' + colorama.Fore.RESET, transcription)
@@ -173,22 +288,6 @@ class STTEngine:
 
     def transcribe(self) -> any:
         try:
-            audio_file = self._record()
-            
-            trimmed_file = self._trim_silence(audio_file)
-
-            transcription = self._transcribe(trimmed_file)
-
-            try:
-                os.remove(audio_file)
-            except FileNotFoundError:
-                pass
-
-            try:
-                os.remove(trimmed_file)
-            except FileNotFoundError:
-                pass
-
-            return transcription
+            return asyncio.run(self.transcribe_async())
         except KeyboardInterrupt:
-            return ''
\ No newline at end of file
+            return ''
@@ -1,23 +1,64 @@
-
+import threading
 import pyttsx3
 import colorama
+import queue
 
 from friday2 import VOICE_CODE
 
 class VoiceEngine:
     def __init__(self, rate: int = 160) -> None:
-        self.engine = pyttsx3.init()
+        self.rate = rate
+
+        self.debug_name = colorama.Fore.GREEN + 'friday:' + colorama.Fore.RESET
 
-        self.engine.setProperty('rate', rate)
-        self.engine.setProperty('volume', 1.0)
+        # @messages are spoken in order by a single driver thread,
+        # - so speak() returns immediately
+        self._queue = queue.Queue()
+        self._ready = threading.Event()
+        self._driver = threading.Thread(target=self._drive, daemon=True)
+        self._error = None
+        self._driver.start()
+        self._ready.wait()
 
-        self.voices = self.engine.getProperty('voices')
-        self.engine.setProperty('voice', self.voices[VOICE_CODE].id)
+        if self._error is not None:
+            raise self._error
 
-        self.debug_name = colorama.Fore.GREEN + 'friday:' + colorama.Fore.RESET
+    # @driver loop, the engine is created and used only on this thread
+    # - (NSSpeechSynthesizer must stay on the thread that created it)
+    # - runAndWait per message, the external loop (iterate) never finishes
+    # - a message on the nsss driver
+    def _drive(self) -> None:
+        try:
+            self.engine = pyttsx3.init()
+
+            self.engine.setProperty('rate', self.rate)
+            self.engine.setProperty('volume', 1.0)
+
+            self.voices = self.engine.getProperty('voices')
+            self.engine.setProperty('voice', self.voices[VOICE_CODE].id)
+        except Exception as error:
+            # @handed to __init__, which raises it on the caller's thread
+            self._error = error
+            return
+        finally:
+            self._ready.set()
+
+        while True:
+            message = self._queue.get()
+            try:
+                self.engine.say(message)
+                self.engine.runAndWait()
+            except Exception as error:
+                # @one failed message must not end the driver thread,
+                # - flush() would wait on the queue forever
+                print(colorama.Fore.RED + '@failed' + colorama.Fore.RESET, 'speaking:', error)
+            finally:
+                self._queue.task_done()
 
     def speak(self, message: str, debug: bool = True) -> None:
         if debug:
             print(self.debug_name, message)
-        self.engine.say(message)
-        self.engine.runAndWait()
\ No newline at end of file
+        self._queue.put(message)
+
+    def flush(self) -> None:
+        self._queue.join()
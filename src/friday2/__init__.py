@@ -2,11 +2,16 @@
 
 from pygdl import download
 
+import urllib.request
 import subprocess
 import colorama
+import hashlib
 import pathlib
+import shutil
 import typing
+import json
 import sys
+import os
 
 
 # @helper method for easy command creation
@@ -20,6 +25,7 @@ def stringify(component: typing.List[typing.Any]) -> typing.List[str]:
 # @global configurations
 MODEL = 'friday2-STT-ftws.tar.gz'
 MODEL_BASENAME = 'friday2-STT-ftws'
+MODEL_RELEASE_API = 'https://api.github.com/repos/d33p0st/friday2/releases/latest'
 
 
 # @system specific configurations.
@@ -27,6 +33,8 @@ if sys.platform.startswith('darwin'):
     CONFIGURATION = pathlib.Path('~/Library/Application Support/Friday').expanduser().resolve()
     VOICE_CODE = 132 # samantha, earlier 14 (daniel)
     MODEL_PATH = CONFIGURATION.joinpath(MODEL_BASENAME)
+    MODEL_CT2_PATH = CONFIGURATION.joinpath(MODEL_BASENAME + '-ct2')
+    WAKEWORD_MODEL_PATH = CONFIGURATION.joinpath('hey_friday.onnx')
     MODEL_EXTRACTION_COMMAND = stringify(['tar', '-xzf', CONFIGURATION.joinpath(MODEL), '-C', CONFIGURATION])
 
 
@@ -34,6 +42,88 @@ if sys.platform.startswith('darwin'):
 CONFIGURATION.mkdir(parents=True, exist_ok=True)
 
 
+# @method to download the model archive from the latest github release
+# - aria2c (8 parallel range requests) when available, else pygdl
+# - verified against the sha256 digest github publishes for the asset
+# - downloaded into a .part directory and only moved to archive once
+# - complete and verified, so an interrupted download is never taken as a cache
+def _download_model(archive: pathlib.Path) -> None:
+
+    # @release asset metadata (download url and digest)
+    try:
+        with urllib.request.urlopen(MODEL_RELEASE_API, timeout=10) as response:
+            release = json.load(response)
+        asset = next((asset for asset in release.get('assets', []) if asset.get('name') == MODEL), None)
+    except (OSError, ValueError):
+        asset = None
+
+    partial = archive.with_name(archive.name + '.part')
+    partial.mkdir(exist_ok=True)
+    downloaded_archive = partial.joinpath(archive.name)
+
+    aria2c = shutil.which('aria2c')
+
+    if aria2c is not None and asset is not None:
+        subprocess.check_call(stringify([
+            aria2c,
+            '-x', 8,
+            '-s', 8,
+            '-c',
+            '-d', partial,
+            '-o', archive.name,
+            asset['browser_download_url']
+        ]))
+    else:
+        downloaded, error = download(
+            filename=MODEL,
+            github_username='d33p0st',
+            github_repository='friday2',
+            output_directory=str(partial)
+        )
+
+        if not downloaded:
+            raise RuntimeError(error)
+
+    # @checksum the archive before it is extracted
+    digest = asset.get('digest') if asset is not None else None
+    if digest and digest.startswith('sha256:'):
+        with open(downloaded_archive, 'rb') as f:
+            checksum = hashlib.file_digest(f, 'sha256').hexdigest()
+
+        if checksum != digest.removeprefix('sha256:'):
+            shutil.rmtree(partial)
+            raise RuntimeError(f'checksum mismatch for {MODEL}, expected {digest} got sha256:{checksum}')
+
+        print(colorama.Fore.GREEN + '@verified' + colorama.Fore.RESET, MODEL)
+
+    downloaded_archive.replace(archive)
+    shutil.rmtree(partial)
+
+
+# @method to extract the model archive into CONFIGURATION
+# - .tar.zst through multithreaded zstd, .tar.gz through pigz (parallel),
+# - piped into tar; plain single threaded tar if neither is available
+def _extract_model(archive: pathlib.Path) -> None:
+
+    if archive.name.endswith('.tar.zst') and shutil.which('zstd') is not None:
+        decompress = stringify(['zstd', '-d', '--long=31', '-T0', '-c', archive])
+    elif archive.name.endswith('.tar.gz') and shutil.which('pigz') is not None:
+        decompress = stringify(['pigz', '-d', '-p', os.cpu_count() or 1, '-c', archive])
+    else:
+        subprocess.check_call(MODEL_EXTRACTION_COMMAND)
+        return
+
+    decompressor = subprocess.Popen(decompress, stdout=subprocess.PIPE)
+    try:
+        subprocess.check_call(stringify(['tar', '-xf', '-', '-C', archive.parent]), stdin=decompressor.stdout)
+    finally:
+        decompressor.stdout.close()
+        decompressor.wait()
+
+    if decompressor.returncode != 0:
+        raise subprocess.CalledProcessError(decompressor.returncode, decompress)
+
+
 # @check if the model path exists.
 if not MODEL_PATH.exists():
 
@@ -45,20 +135,32 @@ if not MODEL_PATH.exists():
         print(colorama.Fore.BLUE + '@need' + colorama.Fore.RESET, 'to download', MODEL)
 
         # @if not caches exist, download it from the github release
-        downloaded, error = download(
-            filename=MODEL,
-            github_username='d33p0st',
-            github_repository='friday2',
-            output_directory=str(CONFIGURATION)
-        )
-
-        if not downloaded:
-            raise RuntimeError(error)
+        _download_model(CONFIGURATION.joinpath(MODEL))
     else:
         print(colorama.Fore.MAGENTA + '@found' + colorama.Fore.RESET, f'cached {MODEL}')
     
     MODEL_PATH.mkdir(parents=True, exist_ok=True)
     # @if any caches exist, or it has been downloaded,
     # - extract the model into MODEL_BASENAME
-    subprocess.check_call(MODEL_EXTRACTION_COMMAND)
-    print(colorama.Fore.GREEN + '@extracted' + colorama.Fore.RESET, "friday's customized STT model at", MODEL_PATH)
\ No newline at end of file
+    _extract_model(CONFIGURATION.joinpath(MODEL))
+    print(colorama.Fore.GREEN + '@extracted' + colorama.Fore.RESET, "friday's customized STT model at", MODEL_PATH)
+
+
+# @method to convert the model for ctranslate2 (faster-whisper), once
+# - called by STTEngine, so importing friday2 does not load transformers/torch
+def convert_ct2_model() -> None:
+
+    if MODEL_CT2_PATH.exists():
+        return
+
+    from ctranslate2.converters import TransformersConverter
+
+    print(colorama.Fore.BLUE + '@need' + colorama.Fore.RESET, 'to convert', MODEL_BASENAME, 'for ctranslate2')
+
+    # @store the weights as float16, the int8 quantization is done
+    # - at load time by faster-whisper (int8 on cpu, int8_float16 on cuda)
+    TransformersConverter(
+        str(MODEL_PATH),
+        copy_files=[file for file in ('tokenizer.json', 'preprocessor_config.json') if MODEL_PATH.joinpath(file).exists()]
+    ).convert(str(MODEL_CT2_PATH), quantization='float16')
+    print(colorama.Fore.GREEN + '@converted' + colorama.Fore.RESET, MODEL_BASENAME, 'at', MODEL_CT2_PATH)
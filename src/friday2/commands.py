@@ -1,13 +1,164 @@
 import re
-import json
-import os
+import pathlib
+import sys
 from typing import Dict, List, Tuple, Optional, Callable
-from difflib import get_close_matches
 import time
 import webbrowser
+import functools
+import collections
+import bisect
+import weakref
 
 from friday2 import CONFIGURATION
 
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+try:
+    import orjson
+except ImportError:
+    import json
+    orjson = None
+
+try:
+    from rapidfuzz import process, fuzz
+except ImportError:
+    from difflib import get_close_matches
+    process = fuzz = None
+
+def _dumps(obj) -> bytes:
+    """Serialize to indented JSON bytes (orjson, or json if it isn't installed)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode()
+
+def _loads(data: bytes):
+    """Deserialize JSON bytes (orjson, or json if it isn't installed)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _save_commands(commands_file: str, commands: Dict, state: Dict) -> None:
+    """Write the commands to the commands file, if they changed since the last save"""
+    if state["dirty"]:
+        pathlib.Path(commands_file).write_bytes(_dumps(commands))
+        state["dirty"] = False
+
+# Constructs hyperscan can't run exactly (prefilter mode only)
+_BACKREFERENCE = re.compile(r"\\[1-9]|\(\?P=")
+_LOOKAROUND = re.compile(r"\(\?<?[=!]")
+
+# Any letter (\w without digits and underscore)
+_LETTER = re.compile(r"[^\W\d_]")
+
+# Whole words only, so "office" or "offline" don't turn the wifi off
+_WIFI_OFF = re.compile(r"\b(?:disconnect|off)\b")
+
+# Written to commands.json on first run, kept as JSON so it is never
+# serialized at runtime (edit the file to customize the commands)
+_DEFAULT_COMMANDS = rb"""{
+  "open": {
+    "patterns": [
+      "open\\s+(\\w+(?:\\s+\\w+)*)",
+      "launch\\s+(\\w+(?:\\s+\\w+)*)",
+      "start\\s+(\\w+(?:\\s+\\w+)*)"
+    ],
+    "apps": {
+      "github": "github.com",
+      "browser": "web_browser",
+      "terminal": "terminal",
+      "vs code": "vscode",
+      "cursor": "cursor_editor",
+      "word": "ms_word",
+      "instagram": "instagram.com"
+    },
+    "function": "open_application"
+  },
+  "find_file": {
+    "patterns": [
+      "find\\s+(?:the\\s+)?(?:files?\\s+)?(?:(?:named|called)\\s+)?[\\\"']?([^\\\"']+?)[\\\"']?(?:\\s+in\\s+(.+)|(?=[\\\"']|\\Z))",
+      "locate\\s+(?:the\\s+)?(?:files?\\s+)?(?:(?:named|called)\\s+)?[\\\"']?([^\\\"']+?)[\\\"']?(?:\\s+in\\s+(.+)|(?=[\\\"']|\\Z))",
+      "find\\s+[\\\"']?([^\\\"']+?)[\\\"']?(?:\\s+in\\s+(.+)|(?=[\\\"']|\\Z))",
+      "where\\s+(?:is|are)\\s+(?:the\\s+)?(?:files?\\s+)?[\\\"']?([^\\\"']+?)[\\\"']?(?:\\s+in\\s+(.+)|(?=[\\\"']|\\Z))"
+    ],
+    "function": "find_files"
+  },
+  "web_search": {
+    "patterns": [
+      "search\\s+(?:the\\s+)?(?:web|internet|online)\\s+for\\s+(.+)",
+      "look\\s+up\\s+online\\s+(.+)",
+      "google\\s+(.+)"
+    ],
+    "function": "web_search"
+  },
+  "system": {
+    "patterns": [
+      "(?P<action>shut\\s*down)(?:\\s+(?:the\\s+)?system)?",
+      "(?P<action>reboot)(?:\\s+(?:the\\s+)?system)?",
+      "(?P<action>restart)(?:\\s+(?:the\\s+)?system)?"
+    ],
+    "function": "system_control"
+  },
+  "create": {
+    "patterns": [
+      "create\\s+(?:a\\s+)?(?:new\\s+)?(\\w[\\w ]*?)\\s+(?:named|called)\\s+[\\\"']?([^\\\"']+?)[\\\"']?(?:\\s+in\\s+(.+)|(?=[\\\"']|\\Z))",
+      "make\\s+(?:a\\s+)?(?:new\\s+)?(\\w[\\w ]*?)\\s+(?:named|called)\\s+[\\\"']?([^\\\"']+?)[\\\"']?(?:\\s+in\\s+(.+)|(?=[\\\"']|\\Z))",
+      "new\\s+(\\w[\\w ]*?)\\s+(?:named|called)\\s+[\\\"']?([^\\\"']+?)[\\\"']?(?:\\s+in\\s+(.+)|(?=[\\\"']|\\Z))"
+    ],
+    "types": [
+      "project",
+      "file",
+      "folder",
+      "directory",
+      "document",
+      "spreadsheet",
+      "presentation",
+      "text file",
+      "python file",
+      "javascript file",
+      "html file",
+      "css file",
+      "markdown file",
+      "json file",
+      "yaml file",
+      "xml file",
+      "database",
+      "script",
+      "note",
+      "todo list",
+      "reminder"
+    ],
+    "function": "create_item"
+  },
+  "wifi": {
+    "patterns": [
+      "(?P<action>connect|disconnect)(?:\\s+(?:from|to))?\\s+(?:the\\s+)?wi-?fi",
+      "turn\\s+(?P<action>on|off)\\s+(?:the\\s+)?wi-?fi"
+    ],
+    "function": "control_wifi"
+  },
+  "timer": {
+    "patterns": [
+      "set\\s+(?:a\\s+)?timer\\s+for\\s+(\\d+)\\s+(second|minute|hour)s?",
+      "remind\\s+me\\s+in\\s+(\\d+)\\s+(second|minute|hour)s?"
+    ],
+    "function": "set_timer"
+  }
+}"""
+
+# Simple keyword-based intent detection
+INTENT_KEYWORDS = {
+    "open": ["open", "launch", "start", "run"],
+    "find_file": ["find", "locate", "where is", "search for file"],
+    "web_search": ["search web", "look up online", "google", "browser search"],
+    "system": ["shutdown", "restart", "reboot", "turn off"],
+    "create": ["create", "make", "new", "generate"],
+    "wifi": ["wifi", "internet", "connect", "disconnect"],
+    "timer": ["timer", "remind", "alarm"]
+}
+
 class CommandParser:
     def __init__(self, commands_file: str = CONFIGURATION.joinpath('commands.json').__str__()):
         """
@@ -16,93 +167,156 @@ class CommandParser:
         Args:
             commands_file: Path to JSON file containing command definitions
         """
-        self.commands = self._load_commands(commands_file)
-        self.command_history = []
+        self._commands_file = commands_file
+        # Shared with the finalizer below, which can't hold on to self
+        self._save_state = {"dirty": False}
+        self.commands = self._intern_commands(self._load_commands(commands_file))
+        self._compile_commands()
+        self._intent_re = self._build_intent_regex()
+        self._kw_to_cmd = {word: cmd for cmd, words in INTENT_KEYWORDS.items() for word in words}
+        # Anything shorter than the shortest keyword can't be an inferred intent
+        self._min_cmd_len = min(len(word) for word in self._kw_to_cmd)
+        # Intent commands as list indices, for scoring in a flat list
+        self._cmd_list = list(INTENT_KEYWORDS.keys())
+        self._cmd_idx = {cmd: i for i, cmd in enumerate(self._cmd_list)}
+        self._kw_lens = tuple(len(INTENT_KEYWORDS[cmd]) for cmd in self._cmd_list)
+        # Parsing is deterministic for a given command set, so repeated
+        # utterances are answered from the cache (cleared in add_command)
+        self._parse_impl = functools.lru_cache(maxsize=512)(self._parse_impl)
+        # (time in ns, transcription, command), bounded for long-running sessions
+        self.command_history = collections.deque(maxlen=1024)
+        # Commands whose results carry more than the matched params
+        self._builders = {
+            "open": self._build_open_result,
+            "create": self._build_create_result,
+            "find_file": self._build_find_file_result
+        }
         self.context = {}
+        # Commands added with add_command are written out at the latest when
+        # the parser is collected or at exit, whichever comes first
+        self._finalizer = weakref.finalize(self, _save_commands, self._commands_file, self.commands, self._save_state)
         
     def _load_commands(self, commands_file: str) -> Dict:
         """Load commands from JSON file or create default commands"""
-        if os.path.exists(commands_file):
-            with open(commands_file, 'r') as f:
-                return json.load(f)
-        else:
-            # Default commands if file doesn't exist
-            default_commands = {
-                "open": {
-                    "patterns": [
-                        r"open\s+(\w+(?:\s+\w+)*)",
-                        r"launch\s+(\w+(?:\s+\w+)*)",
-                        r"start\s+(\w+(?:\s+\w+)*)"
-                    ],
-                    "apps": {
-                        "github": "github.com",
-                        "browser": "web_browser",
-                        "terminal": "terminal",
-                        "vs code": "vscode",
-                        "cursor": "cursor_editor",
-                        "word": "ms_word",
-                        "instagram": "instagram.com"
-                    },
-                    "function": "open_application"
-                },
-                "find_file": {
-                    "patterns": [
-                        r"find\s+(?:the\s+)?(?:file|files)?\s+(?:named|called)?\s+[\"']?([^\"']+)[\"']?(?:\s+in\s+(.+))?",
-                        r"locate\s+(?:the\s+)?(?:file|files)?\s+(?:named|called)?\s+[\"']?([^\"']+)[\"']?(?:\s+in\s+(.+))?",
-                        r"find\s+[\"']?([^\"']+)[\"']?(?:\s+in\s+(.+))?",
-                        r"where\s+(?:is|are)\s+(?:the\s+)?(?:file|files)?\s+[\"']?([^\"']+)[\"']?(?:\s+in\s+(.+))?"
-                    ],
-                    "function": "find_files"
-                },
-                "web_search": {
-                    "patterns": [
-                        r"search\s+(?:the\s+)?(?:web|internet|online)\s+for\s+(.+)",
-                        r"look\s+up\s+online\s+(.+)",
-                        r"google\s+(.+)"
-                    ],
-                    "function": "web_search"
-                },
-                "system": {
-                    "patterns": [
-                        r"shut\s*down(?:\s+(?:the\s+)?system)?",
-                        r"reboot(?:\s+(?:the\s+)?system)?",
-                        r"restart(?:\s+(?:the\s+)?system)?"
-                    ],
-                    "function": "system_control"
-                },
-                "create": {
-                    "patterns": [
-                        r"create\s+(?:a\s+)?(?:new\s+)?(\w+(?:\s+\w+)*)\s+(?:named|called)?\s+[\"']?([^\"']+)[\"']?(?:\s+in\s+(.+))?",
-                        r"make\s+(?:a\s+)?(?:new\s+)?(\w+(?:\s+\w+)*)\s+(?:named|called)?\s+[\"']?([^\"']+)[\"']?(?:\s+in\s+(.+))?",
-                        r"new\s+(\w+(?:\s+\w+)*)\s+(?:named|called)?\s+[\"']?([^\"']+)[\"']?(?:\s+in\s+(.+))?"
-                    ],
-                    "types": ["project", "file", "folder", "directory", "document", "spreadsheet", 
-                             "presentation", "text file", "python file", "javascript file", "html file", 
-                             "css file", "markdown file", "json file", "yaml file", "xml file", 
-                             "database", "script", "note", "todo list", "reminder"],
-                    "function": "create_item"
-                },
-                "wifi": {
-                    "patterns": [
-                        r"(connect|disconnect)(?:\s+(?:from|to))?\s+(?:the\s+)?wi-?fi",
-                        r"turn\s+(on|off)\s+(?:the\s+)?wi-?fi"
-                    ],
-                    "function": "control_wifi"
-                },
-                "timer": {
-                    "patterns": [
-                        r"set\s+(?:a\s+)?timer\s+for\s+(\d+)\s+(second|minute|hour)s?",
-                        r"remind\s+me\s+in\s+(\d+)\s+(second|minute|hour)s?"
-                    ],
-                    "function": "set_timer"
-                }
+        path = pathlib.Path(commands_file)
+        try:
+            return _loads(path.read_bytes())
+        except FileNotFoundError:
+            # Default commands if file doesn't exist, saved to file as they are
+            path.write_bytes(_DEFAULT_COMMANDS)
+            return _loads(_DEFAULT_COMMANDS)
+    
+    def _intern_commands(self, commands: Dict) -> Dict:
+        """Intern command types, function names and apps, they end up in every result"""
+        return {sys.intern(cmd_type): self._intern_command(cmd_config) for cmd_type, cmd_config in commands.items()}
+    
+    def _intern_command(self, cmd_config: Dict) -> Dict:
+        """Intern the function name and apps of one command, in place"""
+        if isinstance(cmd_config.get("function"), str):
+            cmd_config["function"] = sys.intern(cmd_config["function"])
+        if isinstance(cmd_config.get("apps"), dict):
+            cmd_config["apps"] = {
+                sys.intern(app): sys.intern(target) if isinstance(target, str) else target
+                for app, target in cmd_config["apps"].items()
             }
+        return cmd_config
+    
+    def _compile_commands(self) -> None:
+        """Compile every command pattern once, with re.IGNORECASE baked in"""
+        self._compiled = {
+            cmd_type: [re.compile(pattern, re.IGNORECASE) for pattern in cmd_config.get("patterns", [])]
+            for cmd_type, cmd_config in self.commands.items()
+        }
+        # Fuzzy match candidates, built once instead of per "open" match
+        self._apps_keys = {
+            cmd_type: tuple(cmd_config["apps"].keys())
+            for cmd_type, cmd_config in self.commands.items()
+            if "apps" in cmd_config
+        }
+        self._build_search()
+    
+    def _build_search(self) -> None:
+        """Rebuild the combined search structures from the compiled patterns"""
+        self._search_stale = False
+        # (cmd_type, compiled pattern) in command priority order
+        self._patterns = [
+            (cmd_type, pattern)
+            for cmd_type, patterns in self._compiled.items()
+            for pattern in patterns
+        ]
+        self._hs_db = self._compile_hyperscan()
+        # Sorted once, so prefix lookups are a binary search
+        self._suggestions = sorted(
+            {word for words in INTENT_KEYWORDS.values() for word in words}
+            | {app for apps in self._apps_keys.values() for app in apps}
+        )
+    
+    def _compile_hyperscan(self) -> Optional["hyperscan.Database"]:
+        """Compile all patterns into a single Hyperscan database, if available"""
+        # Pattern ids are indices into self._patterns
+        table = self._patterns
+        if hyperscan is None or not table:
+            return None
+        
+        # Ascii semantics only, unicode \w/\s (UTF8 | UCP) multiply the
+        # compile time, non-ascii text uses re instead (see _search)
+        # Each pattern reports once (SINGLEMATCH), only which patterns hit
+        # matters, re.search then finds the groups of the first one
+        base = hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH
+        # Patterns hyperscan can't run exactly (lookarounds...) run in
+        # prefilter mode, whose hits only say that the pattern may match
+        # and are confirmed by that same re.search
+        prefilter_flags = base | hyperscan.HS_FLAG_PREFILTER
+        
+        # Decided from the pattern text, hyperscan can't run lookarounds or
+        # backreferences exactly
+        exact = {
+            id for id, (_, pattern) in enumerate(table)
+            if not _LOOKAROUND.search(pattern.pattern) and not _BACKREFERENCE.search(pattern.pattern)
+        }
+        
+        db = hyperscan.Database()
+        try:
+            db.compile(
+                expressions=[pattern.pattern.encode() for _, pattern in table],
+                ids=list(range(len(table))),
+                elements=len(table),
+                flags=[base if id in exact else prefilter_flags for id in range(len(table))]
+            )
+        except hyperscan.error:
+            return None
+        return db
+    
+    def _build_intent_regex(self) -> re.Pattern:
+        """Build one whole-word alternation over every intent keyword"""
+        # Longest first, so multi-word keywords win over their prefixes
+        words = sorted((word for words in INTENT_KEYWORDS.values() for word in words), key=len, reverse=True)
+        return re.compile(r"\b(?:" + "|".join(map(re.escape, words)) + r")\b")
+    
+    def _search(self, text: str) -> Optional[Tuple[str, re.Pattern, Tuple]]:
+        """Find the first command (in priority order) whose pattern matches, with its groups"""
+        if self._search_stale:
+            self._build_search()
+        
+        if self._hs_db is not None and text.isascii():
+            # One multi-pattern scan, then only the hit patterns run in re for the groups
+            hits = []
+            def on_match(id, start, end, flags, context):
+                hits.append(id)
+            self._hs_db.scan(text.encode(), match_event_handler=on_match)
             
-            # Save default commands to file
-            with open(commands_file, 'w') as f:
-                json.dump(default_commands, f, indent=4)
-                
-            return default_commands
+            for id in sorted(hits):
+                cmd_type, pattern = self._patterns[id]
+                match = pattern.search(text)
+                if match:
+                    return cmd_type, pattern, match.groups()
+            return None
+        
+        for cmd_type, pattern in self._patterns:
+            match = pattern.search(text)
+            if match:
+                return cmd_type, pattern, match.groups()
+        return None
             
     def parse(self, transcription: str) -> Dict:
         """
@@ -119,102 +333,140 @@ class CommandParser:
         text = transcription.lower().strip()
         
         # Match command patterns directly (no trigger phrase detection)
-        result = self._match_command_patterns(text)
+        result = self._parse_impl(text)
         
         # Log the command
         if result:
-            self.command_history.append({
-                "time": time.time(),
-                "transcription": transcription,
-                "command": result
-            })
+            # Copy, so callers can't modify the cached result
+            result = dict(result)
+            self.command_history.append((time.time_ns(), transcription, result))
             
         return result if result else {"command": "unknown", "transcription": transcription}
     
+    def parse_batch(self, transcriptions: List[str]) -> List[Dict]:
+        """
+        Parse several transcriptions in one call, same results as calling parse on each.
+        
+        Args:
+            transcriptions: The transcribed texts from speech recognition
+            
+        Returns:
+            List of command dictionaries, in the order of the transcriptions
+        """
+        # Lookups hoisted out of the loop, one timestamp for the whole batch
+        parse_impl = self._parse_impl
+        log = self.command_history.append
+        now = time.time_ns()
+        
+        results = []
+        for transcription in transcriptions:
+            result = parse_impl(transcription.lower().strip())
+            if result:
+                result = dict(result)
+                log((now, transcription, result))
+            else:
+                result = {"command": "unknown", "transcription": transcription}
+            results.append(result)
+        return results
+    
+    def _parse_impl(self, text: str) -> Optional[Dict]:
+        """Parse normalized text, the cached part of parse"""
+        # Silence transcribes to empty text, which can't match anything
+        if not text:
+            return None
+        return self._match_command_patterns(text)
+    
     def _match_command_patterns(self, text: str) -> Optional[Dict]:
         """Match the text against command patterns"""
-        for cmd_type, cmd_config in self.commands.items():
-            patterns = cmd_config.get("patterns", [])
-            for pattern in patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    result = {
-                        "command": cmd_type,
-                        "function": cmd_config.get("function"),
-                        "params": match.groups(),
-                        "raw_text": text
-                    }
-                    
-                    # Special handling for app opening
-                    if cmd_type == "open" and match.groups():
-                        app_name = match.group(1).lower()
-                        apps_dict = cmd_config.get("apps", {})
-                        
-                        # Try exact match first
-                        if app_name in apps_dict:
-                            result["target"] = apps_dict[app_name]
-                        else:
-                            # Try fuzzy matching
-                            close_matches = get_close_matches(app_name, apps_dict.keys(), n=1, cutoff=0.7)
-                            if close_matches:
-                                result["target"] = apps_dict[close_matches[0]]
-                                result["matched_name"] = close_matches[0]
-                            else:
-                                # No match found, use the raw name
-                                result["target"] = app_name
-                    
-                    # Special handling for create command
-                    if cmd_type == "create" and match.groups():
-                        item_type = match.group(1).lower()
-                        item_name = match.group(2)
-                        location = match.group(3) if len(match.groups()) > 2 and match.group(3) else "current directory"
-                        
-                        # Add additional info to result
-                        result["item_type"] = item_type
-                        result["item_name"] = item_name
-                        result["location"] = location
-                        
-                    # Special handling for find_file command
-                    if cmd_type == "find_file" and match.groups():
-                        file_pattern = match.group(1)
-                        location = match.group(2) if len(match.groups()) > 1 and match.group(2) else "."
+        found = self._search(text)
+        if found:
+            cmd_type, pattern, params = found
+            cmd_config = self.commands[cmd_type]
+            result = {
+                "command": cmd_type,
+                "function": cmd_config.get("function"),
+                "params": params,
+                "raw_text": text
+            }
+            
+            # Which alternative matched (shutdown/reboot, on/off...), so the
+            # executor doesn't have to search the text again
+            if "action" in pattern.groupindex:
+                action = params[pattern.groupindex["action"] - 1]
+                if action:
+                    result["action"] = "".join(action.lower().split())
+            
+            # Command specific details (app target, item name, location...)
+            builder = self._builders.get(cmd_type)
+            if builder is not None and params:
+                builder(result, cmd_config, params)
                         
-                        result["file_pattern"] = file_pattern
-                        result["location"] = location
-                                
-                    return result
+            return result
         
-        # If no pattern matched, try to infer the intent
+        # If no pattern matched, try to infer the intent (from keywords
+        # only, so too short or letterless text like "..." or "ok" has none)
+        if len(text) < self._min_cmd_len or not _LETTER.search(text):
+            return None
         return self._infer_intent(text)
     
+    def _build_open_result(self, result: Dict, cmd_config: Dict, params: Tuple) -> None:
+        """Resolve the app to open"""
+        # The text is already lowercased by parse
+        app_name = params[0]
+        apps_dict = cmd_config.get("apps", {})
+        
+        # Try exact match first, fuzzy matching only on an actual miss
+        target = apps_dict.get(app_name)
+        if target is not None:
+            result["target"] = target
+            return
+        
+        best = self._closest_app(app_name, self._apps_keys.get(result["command"], ()))
+        if best:
+            result["target"] = apps_dict[best]
+            result["matched_name"] = best
+        else:
+            # No match found, use the raw name
+            result["target"] = app_name
+    
+    def _build_create_result(self, result: Dict, cmd_config: Dict, params: Tuple) -> None:
+        """Add the type, name and location of the item to create"""
+        result["item_type"] = params[0].lower()
+        result["item_name"] = params[1]
+        result["location"] = params[2] if len(params) > 2 and params[2] else "current directory"
+    
+    def _build_find_file_result(self, result: Dict, cmd_config: Dict, params: Tuple) -> None:
+        """Add the file pattern and the location to search in"""
+        result["file_pattern"] = params[0]
+        result["location"] = params[1] if len(params) > 1 and params[1] else "."
+    
+    def _closest_app(self, app_name: str, candidates: Tuple[str, ...]) -> Optional[str]:
+        """Find the closest known app name (rapidfuzz, or difflib if it isn't installed)"""
+        if process is not None:
+            best = process.extractOne(app_name, candidates, scorer=fuzz.ratio, score_cutoff=70)
+            return best[0] if best else None
+        matches = get_close_matches(app_name, candidates, n=1, cutoff=0.7)
+        return matches[0] if matches else None
+    
     def _infer_intent(self, text: str) -> Optional[Dict]:
         """Infer the command intent from free-form text"""
-        # Simple keyword-based intent detection
-        keywords = {
-            "open": ["open", "launch", "start", "run"],
-            "find_file": ["find", "locate", "where is", "search for file"],
-            "web_search": ["search web", "look up online", "google", "browser search"],
-            "system": ["shutdown", "restart", "reboot", "turn off"],
-            "create": ["create", "make", "new", "generate"],
-            "wifi": ["wifi", "internet", "connect", "disconnect"],
-            "timer": ["timer", "remind", "alarm"]
-        }
-        
-        # Find which keywords appear in the text
-        scores = {cmd: 0 for cmd in keywords}
-        for cmd, words in keywords.items():
-            for word in words:
-                if word in text:
-                    scores[cmd] += 1
+        # Find which keywords appear in the text, in a single pass
+        # (each keyword counts once, however often it occurs)
+        scores = [0] * len(self._cmd_list)
+        for word in set(self._intent_re.findall(text)):
+            scores[self._cmd_idx[self._kw_to_cmd[word]]] += 1
         
         # Get the command with the highest score, if any
-        if max(scores.values()) > 0:
-            best_cmd = max(scores, key=scores.get)
+        # (index finds the first maximum, so ties go to the earlier command)
+        best = max(scores)
+        if best > 0:
+            i = scores.index(best)
+            best_cmd = self._cmd_list[i]
             return {
                 "command": best_cmd,
                 "function": self.commands.get(best_cmd, {}).get("function"),
                 "inferred": True,
-                "confidence": scores[best_cmd] / len(keywords[best_cmd]),
+                "confidence": best / self._kw_lens[i],
                 "raw_text": text
             }
         
@@ -222,6 +474,7 @@ class CommandParser:
     
     def add_command(self, cmd_type: str, patterns: List[str], function: str, **kwargs) -> None:
         """Add a new command to the system"""
+        cmd_type = sys.intern(cmd_type)
         if cmd_type not in self.commands:
             self.commands[cmd_type] = {
                 "patterns": patterns,
@@ -238,21 +491,47 @@ class CommandParser:
                     self.commands[cmd_type][k].update(v)
                 else:
                     self.commands[cmd_type][k] = v
+        # Only the added or updated command, the others are interned already
+        self._intern_command(self.commands[cmd_type])
+        
+        # Compile only the new patterns, the existing ones are kept as they are
+        self._compiled.setdefault(cmd_type, []).extend(re.compile(pattern, re.IGNORECASE) for pattern in patterns)
+        if "apps" in self.commands[cmd_type]:
+            self._apps_keys[cmd_type] = tuple(self.commands[cmd_type]["apps"].keys())
+        # Rebuilt once on the next search, not on every add_command
+        self._search_stale = True
+        self._parse_impl.cache_clear()
         
-        # Save commands to file
-        with open("commands.json", 'w') as f:
-            json.dump(self.commands, f, indent=4)
+        # Written to file by save(), so bulk additions are saved once
+        self._save_state["dirty"] = True
+    
+    def save(self) -> None:
+        """Save the commands to the commands file, if they changed"""
+        _save_commands(self._commands_file, self.commands, self._save_state)
     
     def get_suggestions(self, partial_command: str) -> List[str]:
         """Get suggestions for partial commands"""
+        prefix = partial_command.lower().strip()
+        if not prefix:
+            return []
+        if self._search_stale:
+            self._build_search()
+        
+        # Every keyword and app name starting with the prefix sits right
+        # after its insertion point in the sorted list
         suggestions = []
-        for cmd_type, cmd_config in self.commands.items():
-            # TODO: Implement suggestion logic
-            pass
+        for candidate in self._suggestions[bisect.bisect_left(self._suggestions, prefix):]:
+            if not candidate.startswith(prefix):
+                break
+            suggestions.append(candidate)
         return suggestions
 
 
 class CommandExecutor:
+    # Parsed "action" -> what to do
+    SYSTEM_ACTIONS = {"shutdown": "shutdown", "reboot": "restart", "restart": "restart"}
+    WIFI_ACTIONS = {"connect": "connect", "on": "connect", "disconnect": "disconnect", "off": "disconnect"}
+    
     def __init__(self, parser: CommandParser):
         """Initialize the command executor"""
         self.parser = parser
@@ -320,7 +599,10 @@ class CommandExecutor:
     
     def system_control(self, cmd_data: Dict) -> Dict:
         """Control system functions"""
-        action = "shutdown" if "shut" in cmd_data.get("raw_text", "") else "restart"
+        action = self.SYSTEM_ACTIONS.get(cmd_data.get("action"))
+        if action is None:
+            # Inferred or custom commands don't carry an action
+            action = "shutdown" if "shut" in cmd_data.get("raw_text", "") else "restart"
         print(f"[ASSISTANT] Initiating system {action}...")
         # In a real implementation, you would add code to control the system
         return {"action": action, "status": "initiated"}
@@ -364,7 +646,10 @@ class CommandExecutor:
 
     def control_wifi(self, cmd_data: Dict) -> Dict:
         """Control WiFi connection"""
-        action = "connect" if any(x in cmd_data.get("raw_text", "") for x in ["connect", "on"]) else "disconnect"
+        action = self.WIFI_ACTIONS.get(cmd_data.get("action"))
+        if action is None:
+            # Inferred or custom commands don't carry an action
+            action = "disconnect" if _WIFI_OFF.search(cmd_data.get("raw_text", "")) else "connect"
         print(f"[JARVIS] {action.capitalize()}ing WiFi...")
         # In a real implementation, you would add code to control WiFi
         return {"action": action, "status": "completed"}
@@ -13,4 +13,10 @@ class STTEngine:
     def transcribe(self) -> str:
         """Goes into listening mode and records
         as soon as speech is detected. uses Friday2 STT
-        FTWB model for speech detection and transcription"""
\ No newline at end of file
+        FTWB model for speech detection and transcription"""
+
+
+    async def transcribe_async(self) -> str:
+        """Same as ``transcribe`` for use inside a running
+        event loop. Recording, speech detection and decoding
+        run as concurrent stages."""
\ No newline at end of file
@@ -16,4 +16,11 @@ class VoiceEngine:
         """
 
     def speak(self, message: str, debug: bool = True) -> None:
-        """Speak any given text."""
\ No newline at end of file
+        """Speak any given text.
+        
+        The message is queued and spoken in the background,
+        this returns immediately.
+        """
+
+    def flush(self) -> None:
+        """Block until every queued message has been spoken."""
\ No newline at end of file
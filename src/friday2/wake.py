@@ -0,0 +1,60 @@
+
+# @this module listens for the wakeword with a small onnx model,
+# - so that whisper only runs once friday has been called
+
+from friday2 import WAKEWORD_MODEL_PATH
+
+from openwakeword.model import Model
+
+import sounddevice
+import colorama
+import queue
+
+
+RATE = 16000
+FRAME = 1280 # 80 ms, the frame size openwakeword works on
+WAKE_THRESHOLD = 0.5
+
+class WakewordEngine:
+
+    def __init__(self, threshold: float = WAKE_THRESHOLD, debug: bool = True) -> None:
+
+        # @custom hey friday model if present, else the pretrained hey jarvis
+        if WAKEWORD_MODEL_PATH.exists():
+            wakeword_model = str(WAKEWORD_MODEL_PATH)
+        else:
+            from openwakeword.utils import download_models
+
+            if debug is True:
+                print(colorama.Fore.RED + '@notfound' + colorama.Fore.RESET, WAKEWORD_MODEL_PATH.name, 'using hey_jarvis')
+
+            download_models(['hey_jarvis'])
+            wakeword_model = 'hey_jarvis'
+
+        self.model = Model(wakeword_models=[wakeword_model], inference_framework='onnx')
+        self.threshold = threshold
+        self.debug = debug
+
+    # @method to block until the wakeword is heard
+    def wait(self) -> None:
+
+        frames = queue.Queue()
+
+        # @runs on the portaudio thread, only hands the frame over
+        def callback(indata, frames_count, time, status):
+            frames.put(indata[:, 0].copy())
+
+        if self.debug:
+            print("Friday is waiting to be called.")
+
+        with sounddevice.InputStream(samplerate=RATE, channels=1, dtype='int16', blocksize=FRAME, callback=callback):
+            while True:
+                scores = self.model.predict(frames.get())
+                if max(scores.values()) >= self.threshold:
+                    break
+
+        # @clear the prediction buffers for the next wait
+        self.model.reset()
+
+        if self.debug:
+            print(colorama.Fore.GREEN + '@wakeword' + colorama.Fore.RESET, 'detected')
@@ -2,9 +2,10 @@
 from friday2.commands import CommandExecutor, CommandParser
 from friday2.stt import STTEngine
 from friday2.tts import VoiceEngine
+from friday2.wake import WakewordEngine
 
 TTS = VoiceEngine()
-STT = STTEngine()
+WAKE = WakewordEngine()
 PARSER = CommandParser()
 EXECUTOR = CommandExecutor(PARSER)
 
@@ -12,12 +13,11 @@ TTS.speak('booting up!')
 TTS.speak('All systems online!')
 TTS.speak("I'll be here if you need me sir.")
 
-while True:
-    text = STT.transcribe()
-    if 'friday' in text.lower():
-        break
+WAKE.wait()
 
 TTS.speak('Did you call me sir!')
+STT = STTEngine()
+TTS.flush()
 
 text = STT.transcribe()
 
@@ -25,4 +25,6 @@ status = EXECUTOR.execute(text)
 if status['success']:
     TTS.speak("I have opened " + status['command_data']['target'])
 else:
-    TTS.speak("I did not quite understand what you wanted")
\ No newline at end of file
+    TTS.speak("I did not quite understand what you wanted")
+
+TTS.flush()
\ No newline at end of file
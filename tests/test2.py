@@ -15,6 +15,10 @@ class CommandParser:
         """
         self.commands = self._load_commands(commands_file)
         self.trigger_phrases = ["hey friday", "friday", "jarvis", "hey jarvis"]
+        # Longest first, so "hey friday" wins over "friday"
+        triggers = "|".join(map(re.escape, sorted(self.trigger_phrases, key=len, reverse=True)))
+        self._trigger_re = re.compile(r"^(?:" + triggers + r")\b\s*", re.IGNORECASE)
+        self._trigger_end_re = re.compile(r"\s*\b(?:" + triggers + r")$", re.IGNORECASE)
         self.command_history = []
         self.context = {}
         
@@ -101,23 +105,15 @@ class CommandParser:
         # Normalize text for easier matching
         text = transcription.lower().strip()
         
-        # Check if text starts with or contains a trigger phrase
-        has_trigger = False
-        trigger_pos = len(text)
-        for trigger in self.trigger_phrases:
-            if text.startswith(trigger):
-                text = text[len(trigger):].strip()
-                has_trigger = True
-                break
-            pos = text.find(trigger)
-            if pos != -1 and pos < trigger_pos:
-                trigger_pos = pos
-                has_trigger = True
-        
-        if has_trigger and trigger_pos < len(text):
-            # Extract the part after the trigger phrase if it's in the middle
-            if not text and trigger_pos > 0:
-                text = text[trigger_pos + len(trigger):].strip()
+        # Check if text starts or ends with a trigger phrase; one in the
+        # middle is part of the command ("search the web for jarvis marvel")
+        match = self._trigger_re.match(text)
+        if match:
+            text = text[match.end():]
+        else:
+            match = self._trigger_end_re.search(text)
+            if match:
+                text = text[:match.start()]
         
         # If no explicit command structure is found, try to detect the intent
         result = self._match_command_patterns(text)